@@ -1,15 +1,96 @@
+import hashlib
+import os
+import multiprocessing
+import pickle
 import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
 import numpy as np
 
+
+SMALL_CSV_BYTES = 1 << 20
+
+# Only the columns the plots use ('NodeCount.1' is an older name for LeafUtilization)
+NEEDED = ['TreeType', 'Sortedness', 'ReadRatio', 'InsertTime', 'PointLookupTime', 'RangeQueryTime',
+          'MixedWorkloadTime', 'LeafCount', 'LeafUtilization', 'FastPathHits', 'SortedLeafSearch',
+          'NodeCount.1']
+# Allocated in their final dtypes at parse time. Categorical codes make TreeType
+# grouping integer work, and plotting doesn't need double precision.
+DTYPES = {
+    'TreeType': 'category',
+    'Sortedness': 'float32',
+    'ReadRatio': 'float32',
+    'InsertTime': 'float32',
+    'PointLookupTime': 'float32',
+    'RangeQueryTime': 'float32',
+    'MixedWorkloadTime': 'float32',
+    'LeafUtilization': 'float32',
+    'NodeCount.1': 'float32',
+}
+
+
+def read_csv(csv_file):
+    return pd.read_csv(csv_file, usecols=lambda c: c in NEEDED, dtype=DTYPES)
+
+
+def load_cached(csv_file):
+    # Keep a Feather sidecar next to the CSV so repeat runs skip text parsing.
+    # Feather needs pyarrow; without it we just read the CSV every time.
+    # Tiny CSVs (the usual benchmark output) parse faster than pyarrow imports.
+    if os.path.getsize(csv_file) < SMALL_CSV_BYTES:
+        return read_csv(csv_file)
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        return read_csv(csv_file)
+
+    # Tag the sidecar with the schema so changing NEEDED/DTYPES never reuses an old cache
+    schema_tag = hashlib.sha1(repr((NEEDED, sorted(DTYPES.items()))).encode()).hexdigest()[:8]
+    sidecar = f"{csv_file}.{schema_tag}.feather"
+    if not os.path.exists(sidecar) or os.path.getmtime(sidecar) < os.path.getmtime(csv_file):
+        # Uncompressed so the columns can be memory-mapped straight from the page cache
+        feather.write_feather(read_csv(csv_file), sidecar, compression='uncompressed')
+    return feather.read_table(sidecar, memory_map=True).to_pandas()
+
+
 # Load CSV
-plt.rcParams.update({'font.size': 14})
+matplotlib.rcParams.update({
+    'font.size': 14,
+    # Drop sub-pixel line segments at render time and keep Agg paths chunked
+    'path.simplify': True,
+    'path.simplify_threshold': 1.0,
+    'agg.path.chunksize': 10000,
+    'pdf.compression': 9,
+})
 csv_file = "build/btree_benchmark_cleaned.csv"
-data = pd.read_csv(csv_file)
+data = load_cached(csv_file)
 
 # Add percentage column
 data['Sortedness_Percent'] = data['Sortedness'] * 100
 
+# Sort once; every (ratio, tree) subset below keeps this order
+data = data.sort_values(['ReadRatio', 'TreeType', 'Sortedness_Percent']).reset_index(drop=True)
+
+# Axis values shared by every plot
+READ_RATIOS = sorted(data['ReadRatio'].unique())
+TREE_TYPES = sorted(data['TreeType'].unique())
+SORTEDNESS = sorted(data['Sortedness_Percent'].unique())
+X = np.arange(len(SORTEDNESS))
+
+# (ratio, tree) -> contiguous row range in the sorted module-level frame, sliced
+# as views; the plot functions read that frame directly so the ranges always match
+GROUPS = {k: (idx.min(), idx.max() + 1)
+          for k, idx in data.groupby(['ReadRatio', 'TreeType'], observed=True).groups.items()}
+
+# Adjust FastPathHits to percentage (given 100000 inserts)
+data['FastPathHits'] = data['FastPathHits'] / 1000.0
+
+# Rename column to match plotting function
+data['LeafUtilization'] = data['NodeCount.1'] if 'NodeCount.1' in data.columns else data['LeafUtilization']
+
 colors = {
     "LoggedBTree": '#E0E26E',
     "OptimizedBTree": '#74B488',
@@ -17,82 +98,88 @@ colors = {
     "LasTree": '#B494AB',
 }
 
-def plot_metric_by_read_ratio(data, metric, ylabel, title, filename, bar_unit_scale=1.0):
-    read_ratios = sorted(data['ReadRatio'].unique())
-    tree_types = sorted(data['TreeType'].unique())
-    sortedness = sorted(data['Sortedness_Percent'].unique())
-
-    x = np.arange(len(sortedness))
+# Bar plots: (column, y label, title, output file, bar unit scale)
+METRICS = [
+    ('InsertTime', 'Insert Time (ms)', 'Insert Performance', 'insert_performance.png', 1.0),
+    ('PointLookupTime', 'Search Time (ms)', 'Point Query Performance', 'point_performance.png', 1.0),
+    ('RangeQueryTime', 'Search Time (ms)', 'Range Query Performance', 'range_performance.png', 1.0),
+    ('FastPathHits', 'Fast Path Hit (%)', 'Fast Path Usage', 'fast_path_hits.png', 1.0),
+    ('MixedWorkloadTime', 'Mixed Workload Time (ms)', 'Mixed Workload Performance (70% insert, 30% lookup)', 'mixed_workload.png', 1.0),
+    ('SortedLeafSearch', 'count', 'Search Count on Sorted Leaf', 'sorted_leaf_search_count.png', 1.0),
+    ('LeafCount', 'Leaf Count', 'Leaf Node Usage', 'styled_leaf_count.png', 1.0),
+]
+
+_fig = None
+_axes = None
+
+
+def _get_axes():
+    # One Figure per process, cleared and reused for every plot it renders
+    global _fig, _axes
+    if _fig is None:
+        _fig = Figure(figsize=(14, 5 * len(READ_RATIOS)))
+        _axes = _fig.subplots(len(READ_RATIOS), 1, squeeze=False)[:, 0]
+    else:
+        for ax in _axes:
+            ax.clear()
+    return _fig, _axes
+
+
+def plot_metric_by_read_ratio(metric, ylabel, title, filename, bar_unit_scale=1.0):
     width = 0.15
 
-    plt.figure(figsize=(14, 5 * len(read_ratios)))
-
-    for i, ratio in enumerate(read_ratios, 1):
-        ax = plt.subplot(len(read_ratios), 1, i)
-        for j, tree in enumerate(tree_types):
-            subset = data[(data['ReadRatio'] == ratio) & (data['TreeType'] == tree)].sort_values("Sortedness_Percent")
-            bar_vals = subset[metric].values / bar_unit_scale
-            bars = plt.bar(
-                x + j * width,
-                bar_vals,
-                width,
-                label=tree,
-                edgecolor='black',
-                color=colors.get(tree, 'gray')
-            )
-
-        ax.set_xticks(x + width * (len(tree_types) - 1) / 2)
-        ax.set_xticklabels([f"{int(s)}" for s in sortedness])
+    metric_arr = data[metric].to_numpy()
+
+    fig, axes = _get_axes()
+
+    for ax, ratio in zip(axes, READ_RATIOS):
+        # Collect every tree's bars so the subplot gets a single bar() call
+        all_x, all_heights, all_colors = [], [], []
+        for j, tree in enumerate(TREE_TYPES):
+            start, stop = GROUPS[(ratio, tree)]
+            bar_vals = metric_arr[start:stop] / bar_unit_scale
+            all_x.append(X + j * width)
+            all_heights.append(bar_vals)
+            all_colors += [colors.get(tree, 'gray')] * len(bar_vals)
+        ax.bar(
+            np.concatenate(all_x),
+            np.concatenate(all_heights),
+            width,
+            edgecolor='black',
+            color=all_colors,
+            rasterized=True
+        )
+        handles = [Patch(facecolor=colors.get(tree, 'gray'), edgecolor='black', label=tree) for tree in TREE_TYPES]
+
+        ax.set_xticks(X + width * (len(TREE_TYPES) - 1) / 2)
+        ax.set_xticklabels([f"{s:.0f}" for s in SORTEDNESS])
         ax.set_title(f"{title}")
         ax.set_xlabel('% Sortedness')
         ax.set_ylabel(ylabel)
-        ax.legend(loc='center left', bbox_to_anchor=(1.0, 0.5), frameon=False)
+        ax.legend(handles=handles, loc='center left', bbox_to_anchor=(1.0, 0.5), frameon=False)
         ax.grid(True, axis='y')
 
-    plt.tight_layout()
-    plt.savefig(filename)
-    plt.savefig(filename + ".pdf", bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig(filename)
     print(f"Saved plot to: {filename}")
-    # plt.show()
+    return fig
 
-# Adjust FastPathHits to percentage (given 100000 inserts)
-data['FastPathHits'] = data['FastPathHits'] / 1000.0
+# Plot Leaf Utilization (as a line plot instead of bar)
+def plot_utilization(filename):
+    utilization_arr = data['LeafUtilization'].to_numpy()
+    sortedness_arr = data['Sortedness_Percent'].to_numpy()
 
-# Plot
-plot_metric_by_read_ratio(data, 'InsertTime', 'Insert Time (ms)', 'Insert Performance', 'insert_performance.png')
-plot_metric_by_read_ratio(data, 'PointLookupTime', 'Search Time (ms)', 'Point Query Performance', 'point_performance.png')
-plot_metric_by_read_ratio(data, 'RangeQueryTime', 'Search Time (ms)', 'Range Query Performance', 'range_performance.png')
-plot_metric_by_read_ratio(data, 'FastPathHits', 'Fast Path Hit (%)', 'Fast Path Usage', 'fast_path_hits.png', bar_unit_scale=1.0)
-plot_metric_by_read_ratio(data, 'MixedWorkloadTime', 'Mixed Workload Time (ms)', 'Mixed Workload Performance (70% insert, 30% lookup)', 'mixed_workload.png')
-plot_metric_by_read_ratio(data, 'SortedLeafSearch', 'count', 'Search Count on Sorted Leaf', 'sorted_leaf_search_count.png')
-
-# Plot Leaf Count
-plot_metric_by_read_ratio(
-    data,
-    'LeafCount',
-    'Leaf Count',
-    'Leaf Node Usage',
-    'styled_leaf_count.png'
-)
+    fig, axes = _get_axes()
 
-# Plot Leaf Utilization (as a line plot instead of bar)
-def plot_utilization(data, filename):
-    read_ratios = sorted(data['ReadRatio'].unique())
-    tree_types = sorted(data['TreeType'].unique())
-    sortedness = sorted(data['Sortedness_Percent'].unique())
-
-    plt.figure(figsize=(14, 5 * len(read_ratios)))
-
-    for i, ratio in enumerate(read_ratios, 1):
-        ax = plt.subplot(len(read_ratios), 1, i)
-        for tree in tree_types:
-            subset = data[(data['ReadRatio'] == ratio) & (data['TreeType'] == tree)].sort_values("Sortedness_Percent")
-            y = subset['LeafUtilization'].values
-            x = subset['Sortedness_Percent'].values
+    for ax, ratio in zip(axes, READ_RATIOS):
+        for tree in TREE_TYPES:
+            start, stop = GROUPS[(ratio, tree)]
+            y = utilization_arr[start:stop]
+            x = sortedness_arr[start:stop]
             ax.plot(x, y, marker='o', label=tree, color=colors.get(tree, 'gray'))
 
         ax.set_ylim(0, 1)
-        ax.set_xticks(sortedness)
+        ax.set_xticks(SORTEDNESS)
         ax.set_title(f"Leaf Utilization")
         # ax.set_title(f"Leaf Utilization (ReadRatio={ratio:.1f})")
         ax.set_xlabel('% Sortedness')
@@ -100,12 +187,29 @@ def plot_utilization(data, filename):
         ax.grid(True)
         ax.legend(loc='center left', bbox_to_anchor=(1.0, 0.5), frameon=False)
 
-    plt.tight_layout()
-    plt.savefig(filename)
-    plt.savefig(filename + ".pdf", bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig(filename)
     print(f"Saved plot to: {filename}")
-    # plt.show()
+    return fig
 
-# Rename column to match plotting function
-data['LeafUtilization'] = data['NodeCount.1'] if 'NodeCount.1' in data.columns else data['LeafUtilization']
-plot_utilization(data, 'leaf_utilization.png')
\ No newline at end of file
+
+def _render(task):
+    # Runs in a pool worker; each worker draws into its own figures
+    plot_fn, *args = task
+    # Pickle now: this process clears and reuses the figure for its next plot
+    return pickle.dumps(plot_fn(*args))
+
+
+if __name__ == '__main__':
+    tasks = [(plot_metric_by_read_ratio, *spec) for spec in METRICS]
+    tasks.append((plot_utilization, 'leaf_utilization.png'))
+
+    # Plots are independent, so render and save them concurrently
+    with multiprocessing.Pool(min(len(tasks), os.cpu_count() or 1)) as pool:
+        figures = pool.map(_render, tasks)
+
+    # PdfPages can't be shared across processes, so pages are written here
+    with PdfPages('all_plots.pdf') as pdf:
+        for fig in figures:
+            pdf.savefig(pickle.loads(fig), bbox_inches='tight', dpi=150)
+    print("Saved plots to: all_plots.pdf")